@@ -1,12 +1,23 @@
 import os
+import re
+import sys
 import json
 import time
+import errno
+import ctypes
 import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 import flet as ft
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json reads the same files, just slower
+    orjson = None
+
 # ---------- Compatibility shims (icons/colors across Flet versions) ----------
 ICONS = getattr(ft, "icons", None)
 if ICONS is None:
@@ -19,13 +30,45 @@ if COLORS is None:
 
 # ---------- App constants ----------
 VIDEO_EXTS = {".mp4", ".mkv", ".avi", ".mov", ".m4v", ".wmv", ".flv", ".webm"}
+# Built from VIDEO_EXTS so there's one list to edit; one C-level search per name.
+# (?<=.) needs a non-empty stem, like Path.suffix: a dotfile named ".mkv" has no suffix.
+_VIDEO_EXT_RE = re.compile(
+    r"(?<=.)\.(?:" + "|".join(re.escape(e[1:]) for e in sorted(VIDEO_EXTS)) + r")\Z", re.IGNORECASE
+)
+RENAME_WORKERS = 8
+# \d+ rather than \d{2}: episodes past 99 come out of our own tag as E100+
+_EXISTING_TAG_RE = re.compile(r"S\d+E\d+", re.IGNORECASE)
+PROGRESS_UPDATE_INTERVAL = 1 / 30  # seconds; caps progress bar redraws at ~30/s
 SETTINGS_PATH = Path.home() / ".jellyfin_renamer_settings.json"
+UNDO_LOG_MAGIC = "jellyfin_renamer_undo"
+UNDO_LOG_VERSION = 1
+UNDO_LOG_FSYNC_EVERY = 64
+UNDO_LOG_BUFFER = 1 << 20
+
+
+def json_dumps(obj, indent: bool = False) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            pass  # e.g. a non-UTF-8 file name (lone surrogates), which orjson refuses
+    # ensure_ascii escapes those surrogates as \udcXX, so any path Python can hold round-trips
+    return json.dumps(obj, indent=2 if indent else None).encode("ascii")
+
+
+def json_loads(data: bytes):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass  # orjson rejects \udcXX escapes that stdlib json (and json_dumps) produce
+    return json.loads(data)
 
 
 def load_settings() -> dict:
     try:
         if SETTINGS_PATH.exists():
-            return json.loads(SETTINGS_PATH.read_text(encoding="utf-8"))
+            return json_loads(SETTINGS_PATH.read_bytes())
     except Exception:
         pass
     return {
@@ -44,70 +87,221 @@ def load_settings() -> dict:
 
 def save_settings(s: dict):
     try:
-        SETTINGS_PATH.write_text(json.dumps(s, indent=2), encoding="utf-8")
+        SETTINGS_PATH.write_bytes(json_dumps(s, indent=True))
     except Exception:
         pass
 
 
-def list_media_files(folder: Path, recurse: bool) -> List[Path]:
-    if recurse:
-        files = [p for p in folder.rglob("*") if p.is_file() and p.suffix.lower() in VIDEO_EXTS]
-    else:
-        files = [p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in VIDEO_EXTS]
-    return files
-
+def read_undo_log(path: Path) -> List[dict]:
+    with open(path, "rb") as f:
+        first = f.readline()
+        if first.lstrip().startswith(b"["):
+            return json_loads(first + f.read())  # older runs wrote one indented JSON array
+        header = json_loads(first) if first.strip() else {}
+        if header.get("log") != UNDO_LOG_MAGIC or header.get("version", 0) > UNDO_LOG_VERSION:
+            raise ValueError("not a recognized undo log")
+        changes = []
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json_loads(line)
+            except ValueError:
+                break  # torn last record from an interrupted run; everything before it is valid
+            if record.get("log") == UNDO_LOG_MAGIC:
+                continue  # header of a later run appended to the same file
+            changes.append(record)
+    return changes
+
+
+def _scandir_recursive(path: str, recurse: bool = True) -> Iterator[os.DirEntry]:
+    # DirEntry caches the type info from the directory listing, so is_file()/is_dir()
+    # don't cost an extra stat() per entry like Path.is_file() does.
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if recurse:
+                        yield from _scandir_recursive(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+            except (PermissionError, FileNotFoundError):
+                # Unreadable subfolder, or the entry vanished mid-scan
+                continue
+
+
+def scan_and_sort(folder: Path, recurse: bool, use_ctime: bool,
+                  cancel_event: Optional[threading.Event] = None) -> List[Path]:
+    # Single pass: filter, stat once and build the sort key while scanning.
+    # Kept as parallel columns (times in a packed double array) rather than one
+    # tuple per file, which is mostly object overhead on big libraries.
+    times = array("d")
+    names: List[str] = []
+    paths: List[str] = []
+    for entry in _scandir_recursive(str(folder), recurse):
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+        name = entry.name
+        if not _VIDEO_EXT_RE.search(name):
+            continue
+        try:
+            st = entry.stat(follow_symlinks=True)
+        except (PermissionError, FileNotFoundError):
+            continue
+        times.append(st.st_ctime if use_ctime else st.st_mtime)
+        names.append(name.lower())
+        paths.append(entry.path)
+    # Two stable sorts give (time, name) order without building a key tuple per file
+    order = sorted(range(len(paths)), key=names.__getitem__)
+    order.sort(key=times.__getitem__)
+    return [Path(paths[i]) for i in order]
 
-def sort_files_by_time(files: List[Path], use_ctime: bool) -> List[Path]:
-    key_fn = (lambda p: (p.stat().st_ctime, p.name.lower())) if use_ctime \
-        else (lambda p: (p.stat().st_mtime, p.name.lower()))
-    return sorted(files, key=key_fn)
 
+def _build_with_titles(season: int, episode: int, ext: str, original_name: str) -> str:
+    tag = f"S{season:02d}E{episode:02d}"
+    base = original_name[:-len(ext)] if ext else original_name  # same as Path(...).stem for ext = suffix
+    base_clean = base.lstrip(" .-_")
+    # Drop whatever SxxExx the file already carries, not just one matching the new tag
+    m = _EXISTING_TAG_RE.match(base_clean)
+    title_part = (base_clean[m.end():] if m else base_clean).lstrip(" .-_")
+    return f"{tag}{(' - ' + title_part) if title_part else ''}{ext}"
 
-def already_named_like(target_stem: str, fname: str) -> bool:
-    return fname.upper().startswith(target_stem.upper())
 
-
-def build_new_name(season: int, episode: int, ext: str, keep_titles: bool, original_name: str) -> str:
-    tag = f"S{season:02d}E{episode:02d}"
-    if keep_titles:
-        base = Path(original_name).stem
-        base_clean = base.lstrip(" .-_")
-        if already_named_like(tag, base_clean):
-            title_part = base_clean[len(tag):].lstrip(" .-_")
-        else:
-            title_part = base_clean
-        return f"{tag}{(' - ' + title_part) if title_part else ''}{ext}"
-    else:
-        return f"{tag}{ext}"
+def _build_tag_only(season: int, episode: int, ext: str, original_name: str) -> str:
+    return f"S{season:02d}E{episode:02d}{ext}"
 
 
 def plan_changes(files: List[Path], season: int, start_at: int, keep_titles: bool) -> List[Tuple[Path, Path]]:
     ops = []
-    ep = start_at
-    for f in files:
-        ext = f.suffix
-        new_name = build_new_name(season, ep, ext, keep_titles, f.name)
-        target = f.with_name(new_name)
-        if f.name == new_name:
+    # keep_titles is fixed for the whole run, so pick the builder once
+    build = _build_with_titles if keep_titles else _build_tag_only
+    for ep, f in enumerate(files, start_at):
+        name = f.name
+        new_name = build(season, ep, f.suffix, name)
+        if name == new_name:
             ops.append((f, f))  # no-op
         else:
-            ops.append((f, target))
-        ep += 1
+            # with_name() reuses f's already-parsed parent parts; only real renames pay for it
+            ops.append((f, f.with_name(new_name)))
     return ops
 
 
+def _load_renameat2():
+    # glibc >= 2.28 exposes renameat2(); RENAME_EXCHANGE swaps two paths in one syscall.
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        fn = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+_renameat2 = _load_renameat2()
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+def swap_files(a: Path, b: Path):
+    if _renameat2 is not None:
+        if _renameat2(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE) == 0:
+            return
+        err = ctypes.get_errno()
+        # EINVAL/ENOSYS/EOPNOTSUPP: kernel or filesystem can't exchange; use the fallback
+        if err not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+            raise OSError(err, os.strerror(err), str(a), None, str(b))
+
+    # Fallback (Windows, macOS, older Linux): three renames through a temp name
+    n = 0
+    tmp = a.with_name(f".{a.name}.swap")
+    while tmp.exists():
+        n += 1
+        tmp = a.with_name(f".{a.name}.swap{n}")
+    def stranded(ex: Exception) -> OSError:
+        return OSError(f"Swapping '{a}' and '{b}' failed and could not be rolled back; "
+                       f"the original '{a.name}' is at {tmp}: {ex}")
+
+    os.rename(a, tmp)
+    try:
+        os.rename(b, a)
+    except Exception as ex:
+        try:
+            os.rename(tmp, a)
+        except Exception as rollback_ex:
+            raise stranded(rollback_ex) from ex
+        raise
+    try:
+        os.rename(tmp, b)
+    except Exception as ex:
+        # Undo both steps: a's new content goes back to b, the temp back to a
+        try:
+            os.rename(a, b)
+            os.rename(tmp, a)
+        except Exception as rollback_ex:
+            raise stranded(rollback_ex) from ex
+        raise
+
+
+def find_swaps(ops: List[Tuple[Path, Path]]) -> dict[Path, Path]:
+    # Ops that form a 2-cycle (a -> b and b -> a) can be done as one exchange.
+    mapping = {src: dst for src, dst in ops if src != dst}
+    return {src: dst for src, dst in mapping.items() if mapping.get(dst) == src}
+
+
 def ensure_no_overwrites(ops: List[Tuple[Path, Path]]) -> Tuple[bool, List[str]]:
     errors = []
     targets = {}
+    # Ops normally share one or a few parent folders: resolve and list each of
+    # them once, then compare plain strings instead of resolving every path.
+    bases: dict[Path, str] = {}
+    listings: dict[Path, Tuple[dict, dict]] = {}
+
+    def base_of(folder: Path) -> str:
+        base = bases.get(folder)
+        if base is None:
+            base = bases[folder] = str(folder.resolve())
+        return base
+
+    def listing_of(folder: Path) -> Tuple[dict, dict]:
+        # (name -> entry, casefolded name -> entries) for one folder
+        listing = listings.get(folder)
+        if listing is None:
+            by_name: dict[str, os.DirEntry] = {}
+            by_name_ci: dict[str, List[os.DirEntry]] = {}
+            try:
+                with os.scandir(base_of(folder)) as it:
+                    for entry in it:
+                        by_name[entry.name] = entry
+                        by_name_ci.setdefault(entry.name.casefold(), []).append(entry)
+            except OSError:
+                pass
+            listing = listings[folder] = (by_name, by_name_ci)
+        return listing
+
+    swaps = find_swaps(ops)
+
     for src, dst in ops:
         if src == dst:
             continue
-        if dst.exists() and dst.resolve() != src.resolve():
-            errors.append(f"Would overwrite: {dst}")
-        key = dst.resolve()
-        if key in targets and targets[key] != src.resolve():
+        # Anything already under dst's name (case-insensitively, to be safe on
+        # Windows/macOS) is a conflict unless it is the source's own listing entry,
+        # as in a case-only rename. Hard links to the source still count: rename(2)
+        # between two links to one inode silently does nothing. For a swap, dst is
+        # the other half of the exchange.
+        if src not in swaps:
+            hits = listing_of(dst.parent)[1].get(dst.name.casefold(), [])
+            src_entry = listing_of(src.parent)[0].get(src.name)
+            if any(src_entry is None or hit.path != src_entry.path for hit in hits):
+                errors.append(f"Would overwrite: {dst}")
+        key = os.path.normcase(os.path.join(base_of(dst.parent), dst.name))
+        src_key = os.path.normcase(os.path.join(base_of(src.parent), src.name))
+        if key in targets and targets[key] != src_key:
             errors.append(f"Multiple sources mapped to same target: {dst}")
-        targets[key] = src.resolve()
+        targets[key] = src_key
     return (len(errors) == 0, errors)
 
 
@@ -138,8 +332,11 @@ def main(page: ft.Page):
     files_sorted: List[Path] = []
     edited_names: dict[int, str] = {}
 
-    applying_lock = threading.Lock()
+    apply_running = threading.Event()
     cancel_event = threading.Event()
+    # One event per preview scan; a newer scan or Cancel sets it, and a scan result
+    # is only rendered if its event is still the current one.
+    scan_cancel = threading.Event()
 
     # ---------- Controls ----------
     title_text = ft.Text("Jellyfin Episode Renamer", size=22, weight=ft.FontWeight.BOLD)
@@ -169,19 +366,32 @@ def main(page: ft.Page):
 
     progress_bar = ft.ProgressBar(value=0, width=400, visible=False)
     cancel_btn = ft.TextButton("Cancel", icon=ICONS.CANCEL, visible=False)
+    scan_ring = ft.ProgressRing(width=20, height=20, stroke_width=2, visible=False)
+
+    # Column widths shared by the header and every preview row
+    IDX_W, NEW_NAME_W, STATUS_W = 48, 450, 180
 
-    table = ft.DataTable(
-        columns=[
-            ft.DataColumn(ft.Text("#")),
-            ft.DataColumn(ft.Text("Current Name")),
-            ft.DataColumn(ft.Text("New Name (editable)")),
-            ft.DataColumn(ft.Text("Status")),
+    def header_cell(label: str, width: Optional[int] = None) -> ft.Text:
+        return ft.Text(label, weight=ft.FontWeight.BOLD, width=width, expand=width is None)
+
+    preview_header = ft.Row(
+        [
+            header_cell("#", IDX_W),
+            header_cell("Current Name"),
+            header_cell("New Name (editable)", NEW_NAME_W),
+            header_cell("Status", STATUS_W),
         ],
-        rows=[],
-        width=page.width - 64,
-        data_row_max_height=56,
-        column_spacing=20,
-        heading_row_height=40,
+        spacing=20,
+        height=40,
+    )
+    # ListView only builds the rows that are scrolled into view (DataTable builds all of them),
+    # and a fixed item_extent lets it skip measuring off-screen rows.
+    preview_list = ft.ListView(
+        controls=[],
+        expand=True,
+        spacing=2,
+        item_extent=56,
+        build_controls_on_demand=True,
     )
 
     picker = ft.FilePicker(on_result=lambda e: None)
@@ -200,10 +410,10 @@ def main(page: ft.Page):
     pick_btn.on_click = open_folder_picker
 
     # ---------- Helpers ----------
-    def clear_table():
-        table.rows.clear()
+    def clear_preview():
+        # No update() here: callers push the emptied list with their own update.
+        preview_list.controls.clear()
         edited_names.clear()
-        table.update()
 
     def parse_int(tf: ft.TextField, default: int) -> int:
         try:
@@ -212,23 +422,30 @@ def main(page: ft.Page):
         except Exception:
             return default
 
-    def add_row(idx: int, src: Path, dst: Path, status: str, conflict: bool = False, skip: bool = False):
-        new_name_tf = ft.TextField(
-            value=dst.name,
-            dense=True,
-            on_change=lambda e, i=idx: edited_names.__setitem__(i, e.control.value),
-            width=450,
-        )
-        color = COLORS.RED if conflict else (COLORS.GREY if skip else None)
-        row = ft.DataRow(
-            cells=[
-                ft.DataCell(ft.Text(str(idx))),
-                ft.DataCell(ft.Text(src.name)),
-                ft.DataCell(new_name_tf),
-                ft.DataCell(ft.Text(status, color=color)),
-            ]
+    def on_name_edit(e):
+        # Shared by every row; the row index rides along in the TextField's data.
+        edited_names[e.control.data] = e.control.value
+
+    def build_row() -> ft.Row:
+        return ft.Row(
+            [
+                ft.Text(width=IDX_W),
+                ft.Text(expand=True, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
+                ft.TextField(dense=True, on_change=on_name_edit, width=NEW_NAME_W),
+                ft.Text(width=STATUS_W),
+            ],
+            spacing=20,
+            vertical_alignment=ft.CrossAxisAlignment.CENTER,
         )
-        table.rows.append(row)
+
+    def fill_row(row: ft.Row, idx: int, src: Path, dst: Path, status: str, conflict: bool = False, skip: bool = False):
+        idx_text, name_text, new_name_tf, status_cell = row.controls
+        idx_text.value = str(idx)
+        name_text.value = src.name
+        new_name_tf.value = edited_names.get(idx, dst.name)
+        new_name_tf.data = idx
+        status_cell.value = status
+        status_cell.color = COLORS.RED if conflict else (COLORS.GREY if skip else None)
 
     def rebuild_ops_with_edits() -> List[Tuple[Path, Path]]:
         new_ops: List[Tuple[Path, Path]] = []
@@ -259,9 +476,6 @@ def main(page: ft.Page):
             done, total = msg["done"], msg["total"]
             progress_bar.value = (done / total) if total else 0
             progress_bar.update()
-        elif t == "enable_undo":
-            undo_btn.disabled = False
-            undo_btn.update()
         elif t == "finish":
             done, total, errors, was_canceled = msg["done"], msg["total"], msg["errors"], msg["canceled"]
             progress_bar.visible = False
@@ -269,6 +483,8 @@ def main(page: ft.Page):
             preview_btn.disabled = False
             pick_btn.disabled = False
             apply_btn.disabled = False
+            # Undo stays off for the whole run; only now is the log complete
+            undo_btn.disabled = settings.get("last_log", "") == ""
             msg_text = f"Done. Renamed {done}/{total} file(s)."
             if was_canceled:
                 msg_text = f"Canceled. Renamed {done}/{total} file(s) before cancel."
@@ -277,45 +493,97 @@ def main(page: ft.Page):
             status_text.value = msg_text
             status_text.update()
             do_preview(None)  # refresh
+        elif t == "scan_done":
+            if msg["cancel"] is not scan_cancel:
+                return  # superseded by a newer preview
+            scan_ring.visible = False
+            cancel_btn.visible = False
+            if msg["error"]:
+                clear_preview()
+                status_text.value = f"Failed to list files: {msg['error']}"
+                page.update()
+            elif msg["cancel"].is_set():
+                clear_preview()
+                status_text.value = "Scan canceled."
+                page.update()
+            else:
+                render_preview(msg["files"], msg["season"], msg["start"], msg["keep_titles"])
 
     page.pubsub.subscribe(on_pubsub)
 
     # ---------- Actions ----------
     def do_preview(e):
-        clear_table()
+        nonlocal scan_cancel
+        # Supersede a scan that is still running; the fresh event also makes its
+        # result stale if we return early below.
+        scan_cancel.set()
+        scan_cancel = threading.Event()
+        scan_ring.visible = False
+        cancel_btn.visible = False
         apply_btn.disabled = True
         status_text.value = ""
 
         folder = Path(folder_tf.value.strip()) if folder_tf.value.strip() else None
-        if not folder or not folder.exists() or not folder.is_dir():
+        if not folder or not folder.is_dir():  # is_dir() is False for missing paths too
+            clear_preview()
             status_text.value = "Pick a valid folder."
             page.update()
             return
 
         season = parse_int(season_tf, 1)
         start_ep = parse_int(start_tf, 1)
+        recurse, use_ctime, keep_titles = recurse_chk.value, ctime_chk.value, keep_titles_chk.value
 
-        try:
-            found = list_media_files(folder, recurse_chk.value)
-        except Exception as ex:
-            status_text.value = f"Failed to list files: {ex}"
-            page.update()
-            return
+        # Scanning a big library can take seconds: do it off the UI thread and
+        # hand the result back through pubsub.
+        this_scan = scan_cancel
+
+        def collect_files():
+            files: List[Path] = []
+            error = ""
+            try:
+                files = scan_and_sort(folder, recurse, use_ctime, this_scan)
+            except Exception as ex:
+                error = str(ex) or type(ex).__name__
+            page.pubsub.send_all({
+                "type": "scan_done",
+                "cancel": this_scan,
+                "files": files,
+                "error": error,
+                "season": season,
+                "start": start_ep,
+                "keep_titles": keep_titles,
+            })
+
+        status_text.value = "Scanning…"
+        scan_ring.visible = True
+        cancel_btn.visible = True
+        page.update()
+        threading.Thread(target=collect_files, daemon=True).start()
 
-        if not found:
+    def render_preview(files: List[Path], season: int, start_ep: int, keep_titles: bool):
+        nonlocal files_sorted, planned_ops
+        files_sorted = files
+        if not files_sorted:
+            clear_preview()
             status_text.value = "No video files found."
             page.update()
             return
 
-        nonlocal files_sorted, planned_ops
-        files_sorted = sort_files_by_time(found, ctime_chk.value)
-        planned_ops = plan_changes(files_sorted, season, start_ep, keep_titles_chk.value)
+        planned_ops = plan_changes(files_sorted, season, start_ep, keep_titles)
 
-        for i, (src, dst) in enumerate(planned_ops, start=1):
+        # Reuse the rows already on screen and only change their values, so Flet
+        # sends small property diffs instead of rebuilding every row.
+        rows = preview_list.controls
+        del rows[len(planned_ops):]
+        while len(rows) < len(planned_ops):
+            rows.append(build_row())
+        edited_names.clear()
+        for row, (i, (src, dst)) in zip(rows, enumerate(planned_ops, start=1)):
             if src == dst:
-                add_row(i, src, dst, "SKIP (already named)", skip=True)
+                fill_row(row, i, src, dst, "SKIP (already named)", skip=True)
             else:
-                add_row(i, src, dst, "OK")
+                fill_row(row, i, src, dst, "OK")
 
         save_current_settings()
 
@@ -327,13 +595,14 @@ def main(page: ft.Page):
             status_text.value = f"Preview ready: {len(planned_ops)} file(s). You can edit 'New Name' cells. When ready, click Apply."
             apply_btn.disabled = False
 
-        table.update()
-        apply_btn.update()
-        status_text.update()
+        # One update pushes the rebuilt list, button and status together.
+        page.update()
 
     preview_btn.on_click = do_preview
 
     def do_apply(e):
+        if apply_running.is_set():
+            return
         if not planned_ops:
             status_text.value = "Nothing to apply. Click Preview first."
             status_text.update()
@@ -349,69 +618,143 @@ def main(page: ft.Page):
         apply_btn.disabled = True
         preview_btn.disabled = True
         pick_btn.disabled = True
+        undo_btn.disabled = True
         cancel_btn.visible = True
         progress_bar.visible = True
         progress_bar.value = 0
         page.update()
 
         folder = Path(folder_tf.value.strip())
-        log_path = folder / f"_rename_log_{int(time.time())}.json"
+        log_path = folder / f"_rename_log_{int(time.time())}.jsonl"
         cancel_event.clear()
 
         def run_apply():
             errors = []
-            changes: List[dict] = []
 
-            total = sum(1 for s, d in ops if s != d)
+            pending = [(s, d) for s, d in ops if s != d]
+            total = len(pending)
+            swaps = find_swaps(pending)
             done = 0
+            logged = 0
+            canceled = False
+            last_ui = 0.0
+            # Concurrent renames in the same folder can contend on Windows; stay serial there.
+            workers = 1 if os.name == "nt" else RENAME_WORKERS
 
-            with applying_lock:
+            try:
+                # The log is streamed one JSON line per finished rename, so a crash
+                # mid-run still leaves an undoable record of everything renamed so far.
                 try:
-                    for src, dst in ops:
-                        if cancel_event.is_set():
-                            errors.append("Operation canceled by user.")
-                            break
-                        if src == dst:
-                            continue
-                        try:
-                            os.rename(src, dst)
-                            changes.append({"from": str(src), "to": str(dst)})
-                            done += 1
-                        except Exception as ex:
-                            errors.append(f"Failed to rename '{src.name}': {ex}")
-
-                        page.pubsub.send_all({"type": "progress", "done": done, "total": total})
-
-                    if changes:
-                        try:
-                            log_path.write_text(json.dumps(changes, indent=2), encoding="utf-8")
-                            settings["last_log"] = str(log_path)
-                            save_settings(settings)
-                            page.pubsub.send_all({"type": "enable_undo"})
-                        except Exception as ex:
-                            errors.append(f"Failed to write undo log: {ex}")
-
-                finally:
-                    page.pubsub.send_all({
-                        "type": "finish",
-                        "done": done,
-                        "total": total,
-                        "errors": errors,
-                        "canceled": cancel_event.is_set(),
-                    })
-
+                    # Append-only: a run started within the same second adds to the same log
+                    log_existed = log_path.exists()
+                    logf = open(log_path, "ab", buffering=UNDO_LOG_BUFFER)
+                except Exception as ex:
+                    errors.append(f"Failed to write undo log: {ex}")
+                    return
+
+                def sync_log():
+                    logf.flush()
+                    os.fsync(logf.fileno())
+
+                with logf:
+                    logf.write(json_dumps({"log": UNDO_LOG_MAGIC, "version": UNDO_LOG_VERSION}) + b"\n")
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        futures = {}
+                        scheduled = set()
+                        for src, dst in pending:
+                            if src in swaps and dst in scheduled:
+                                continue  # exchange already scheduled from the other side
+                            scheduled.add(src)
+                            fn = swap_files if src in swaps else os.rename
+                            futures[pool.submit(fn, src, dst)] = (src, dst)
+                        for fut in as_completed(futures):
+                            if fut.cancelled():
+                                continue
+                            src, dst = futures[fut]
+                            is_swap = src in swaps
+                            try:
+                                fut.result()
+                            except Exception as ex:
+                                errors.append(f"Failed to rename '{src.name}': {ex}")
+                                try:
+                                    sync_log()  # keep what's undoable on disk before anything else goes wrong
+                                except Exception:
+                                    pass
+                            else:
+                                done += 2 if is_swap else 1
+                                logged += 1
+                                record = {"from": str(src), "to": str(dst)}
+                                if is_swap:
+                                    record["swap"] = True
+                                try:
+                                    logf.write(json_dumps(record) + b"\n")
+                                    if logged == 1 or logged % UNDO_LOG_FSYNC_EVERY == 0:
+                                        sync_log()
+                                    if logged == 1:
+                                        # Saved early so a crash mid-run still leaves the log findable;
+                                        # the Undo control itself is re-enabled by "finish".
+                                        settings["last_log"] = str(log_path)
+                                        save_settings(settings)
+                                except Exception as ex:
+                                    # Don't keep renaming what can no longer be undone
+                                    errors.append(f"Failed to write undo log: {ex}")
+                                    canceled = True
+                                    for f in futures:
+                                        f.cancel()
+
+                            if cancel_event.is_set() and not canceled:
+                                canceled = True
+                                errors.append("Operation canceled by user.")
+                                for f in futures:
+                                    f.cancel()
+                                try:
+                                    sync_log()
+                                except Exception:
+                                    pass
+
+                            # Local renames finish in microseconds; a UI round trip per file would dominate
+                            now = time.monotonic()
+                            if now - last_ui >= PROGRESS_UPDATE_INTERVAL:
+                                last_ui = now
+                                page.pubsub.send_all({"type": "progress", "done": done, "total": total})
+
+                    page.pubsub.send_all({"type": "progress", "done": done, "total": total})
+
+                    try:
+                        sync_log()
+                    except Exception as ex:
+                        errors.append(f"Failed to write undo log: {ex}")
+
+                if not done and not log_existed:
+                    log_path.unlink(missing_ok=True)
+
+            finally:
+                apply_running.clear()
+                page.pubsub.send_all({
+                    "type": "finish",
+                    "done": done,
+                    "total": total,
+                    "errors": errors,
+                    "canceled": cancel_event.is_set(),
+                })
+
+        # Set here rather than in run_apply so a second Ctrl+Enter can't slip in before the thread starts
+        apply_running.set()
         threading.Thread(target=run_apply, daemon=True).start()
 
     apply_btn.on_click = do_apply
 
     def do_cancel(e):
         cancel_event.set()
+        scan_cancel.set()
         status_text.value = "Cancel requested… finishing current step."
         status_text.update()
 
     cancel_btn.on_click = do_cancel
 
     def do_undo(e):
+        if apply_running.is_set():
+            return  # never rename back while workers are still renaming forward
         last_log = settings.get("last_log", "")
         if not last_log:
             status_text.value = "No undo log found."
@@ -424,7 +767,7 @@ def main(page: ft.Page):
             return
 
         try:
-            changes = json.loads(log_file.read_text(encoding="utf-8"))
+            changes = read_undo_log(log_file)
         except Exception as ex:
             status_text.value = f"Failed to read undo log: {ex}"
             status_text.update()
@@ -436,7 +779,11 @@ def main(page: ft.Page):
             src = Path(item["to"])
             dst = Path(item["from"])
             try:
-                if src.exists() and not dst.exists():
+                if item.get("swap"):
+                    if src.exists() and dst.exists():
+                        swap_files(src, dst)
+                        reverted += 1
+                elif src.exists() and not dst.exists():
                     os.rename(src, dst)
                     reverted += 1
             except Exception as ex:
@@ -454,7 +801,8 @@ def main(page: ft.Page):
     # ---------- Keyboard Shortcuts ----------
     def on_key(e: ft.KeyboardEvent):
         if e.ctrl and e.key.lower() == "p":
-            do_preview(None)
+            if not apply_running.is_set():
+                do_preview(None)
         elif e.ctrl and (e.key == "Enter" or e.key == "NumpadEnter"):
             if not apply_btn.disabled:
                 do_apply(None)
@@ -475,11 +823,11 @@ def main(page: ft.Page):
                     wrap=True,
                     vertical_alignment=ft.CrossAxisAlignment.CENTER,
                 ),
-                ft.Row([preview_btn, apply_btn, undo_btn, progress_bar, cancel_btn], spacing=12),
+                ft.Row([preview_btn, apply_btn, undo_btn, scan_ring, progress_bar, cancel_btn], spacing=12),
                 ft.Divider(),
                 ft.Text("Preview (double-check or edit 'New Name' before Apply)", size=16, weight=ft.FontWeight.BOLD),
                 ft.Container(
-                    content=ft.Column([table], scroll="auto"),
+                    content=ft.Column([preview_header, preview_list], spacing=0),
                     height=380,
                     padding=0,
                 ),